@@ -1,32 +1,100 @@
 import os
+import hashlib
+import mmap
+import queue
+import sqlite3
+import sys
+import threading
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from contextlib import contextmanager
+from importlib import metadata
+from typing import Dict, Iterator, List, Optional, Tuple, Union, cast
+import orjson
 from neo4j import GraphDatabase
+from neo4j.exceptions import TransientError
 import tree_sitter_python as tspython
 import tree_sitter_javascript as tsjs
 import tree_sitter_typescript as tsts
-from tree_sitter import Language, Parser
+from tree_sitter import Language, Node, Parser, Query, QueryCursor, Tree
 
 
+# Driver settings for a single local instance; pool size must cover every writer thread
+DRIVER_CONFIG = {
+    'max_connection_pool_size': 50,
+    'connection_acquisition_timeout': 60,
+    'fetch_size': 1000,
+    'keep_alive': True,
+    'encrypted': False  # localhost only, skip the TLS handshake
+}
+
 class Neo4jConnection:
-    def __init__(self, uri, user, password):
-        self.driver = GraphDatabase.driver(uri, auth=(user, password))
+    def __init__(self, uri, user, password, **driver_config):
+        # bolt:// talks to one server directly; neo4j:// would fetch a routing table per session
+        self.driver = GraphDatabase.driver(uri, auth=(user, password), **{**DRIVER_CONFIG, **driver_config})
+        # One long-lived session for all writes instead of one per call. Sessions are
+        # not thread-safe, so only the writer (e.g. Neo4jBatchWriter) may use it
+        self.session = self.driver.session()
         print("Successfully connected to Neo4j.")
+        self.create_indexes()
 
     def close(self):
+        self.session.close()
         self.driver.close()
 
     # RAG part of the code
     def run_query(self, query, parameters=None):
+        # Reads get their own session, so they are safe from any thread and
+        # alongside the writes on self.session
         with self.driver.session() as session:
             result = session.run(query, parameters)
             return [record for record in result]
 
-    def add_function_node(self, file_path, function_name):
-        with self.driver.session() as session:
-            session.execute_write(self._create_function_node, file_path, function_name)
+    def create_indexes(self):
+        """Make MERGE and the callee MATCH index seeks instead of label scans"""
+        self.session.run(
+            "CREATE CONSTRAINT function_key IF NOT EXISTS "
+            "FOR (f:Function) REQUIRE (f.name, f.file_path) IS UNIQUE"
+        ).consume()
+        self.session.run(
+            "CREATE INDEX function_name IF NOT EXISTS "
+            "FOR (f:Function) ON (f.name)"
+        ).consume()
+
+    # Pass an open transaction (self.session.begin_transaction()) as tx to
+    # group many single writes into one commit; without it each call commits.
+    def add_function_node(self, file_path, function_name, tx=None):
+        if tx is not None:
+            self._create_function_node(tx, file_path, function_name)
+        else:
+            self.session.execute_write(self._create_function_node, file_path, function_name)
             
-    def add_call_relationship(self, caller_func, callee_func, file_path):
-        with self.driver.session() as session:
-            session.execute_write(self._create_call_relationship, caller_func, callee_func, file_path)
+    def add_call_relationship(self, caller_func, callee_func, file_path, tx=None):
+        if tx is not None:
+            self._create_call_relationship(tx, caller_func, callee_func, file_path)
+        else:
+            self.session.execute_write(self._create_call_relationship, caller_func, callee_func, file_path)
+
+    def add_function_nodes_bulk(self, rows):
+        """Create many function nodes in one round-trip; rows are {'name', 'path'} dicts"""
+        self._write_batch(self._create_function_nodes, rows)
+
+    def add_call_relationships_bulk(self, rows):
+        """Create many call relationships in one round-trip; rows are {'caller', 'callee', 'path'} dicts"""
+        self._write_batch(self._create_call_relationships, rows)
+
+    def _write_batch(self, work, rows, retries=3):
+        """Run one batch in an explicit transaction, retrying the whole batch on transient errors"""
+        # execute_write's managed retry protocol is not needed per statement here:
+        # the writes are idempotent MERGEs, so a failed batch is simply sent again
+        for attempt in range(1, retries + 1):
+            try:
+                with self.session.begin_transaction(timeout=120) as tx:
+                    work(tx, rows)
+                return
+            except TransientError as e:
+                if attempt == retries:
+                    raise
+                print(f"Transient error writing a batch of {len(rows)} rows, retrying: {e}")
 
     @staticmethod
     def _create_function_node(tx, file_path, function_name):
@@ -42,149 +110,433 @@ class Neo4jConnection:
         )
         tx.run(query, caller_name=caller_func, callee_name=callee_func, path=file_path)
 
+    @staticmethod
+    def _create_function_nodes(tx, rows):
+        query = (
+            "UNWIND $rows AS r "
+            "MERGE (f:Function {name: r.name, file_path: r.path})"
+        )
+        tx.run(query, rows=rows)
+
+    @staticmethod
+    def _create_call_relationships(tx, rows):
+        query = (
+            "UNWIND $rows AS r "
+            "MATCH (caller:Function {name: r.caller, file_path: r.path}) "
+            "MATCH (callee:Function {name: r.callee}) "
+            "MERGE (caller)-[:CALLS]->(callee)"
+        )
+        tx.run(query, rows=rows)
+
+# Number of rows sent per UNWIND write
+BATCH_SIZE = 10000
+
+SUPPORTED_EXTENSIONS = frozenset({'.py', '.js', '.jsx', '.ts', '.tsx'})
+# Vendored/generated trees that are never worth scanning
+SKIP_DIRS = frozenset({'.git', 'node_modules', '__pycache__', 'venv'})
+
+def iter_source_files(root):
+    """
+    Yield (path, stat) for every supported source file under root, skipping SKIP_DIRS.
+    Same top-down order as os.walk; unreadable directories and dangling links are skipped.
+    """
+    stack = [root]
+    while stack:
+        try:
+            with os.scandir(stack.pop()) as entries:
+                subdirs = []
+                for entry in entries:
+                    name = entry.name
+                    if entry.is_dir(follow_symlinks=False):
+                        if name not in SKIP_DIRS:
+                            subdirs.append(entry.path)
+                        continue
+                    dot = name.rfind('.')
+                    if dot != -1 and name[dot:] in SUPPORTED_EXTENSIONS:
+                        try:
+                            yield entry.path, entry.stat()
+                        except OSError:
+                            continue
+        except OSError:
+            continue
+        # Reversed so the first subdirectory is walked next, as os.walk does
+        stack.extend(reversed(subdirs))
+
+class Neo4jBatchWriter:
+    """Background thread that performs all UNWIND writes for one connection
+
+    Parsing keeps the CPU busy while this thread waits on Bolt round-trips.
+    The driver session is not thread-safe, so nothing else may use the
+    connection until close() returns.
+    """
+
+    def __init__(self, db_connection, batch_size=BATCH_SIZE, max_pending=32):
+        self.db_connection = db_connection
+        self.batch_size = batch_size
+        self.queue = queue.Queue(maxsize=max_pending)
+        self.error = None
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def add_function_nodes(self, rows):
+        self.queue.put(('nodes', rows))
+
+    def add_call_relationships(self, rows):
+        # Queued after every node batch, so all callees exist before they are matched
+        self.queue.put(('calls', rows))
+
+    def close(self):
+        """Flush everything that is still buffered and re-raise any write error"""
+        self.queue.put(None)
+        self.thread.join()
+        if self.error is not None:
+            raise self.error
+
+    def _run(self):
+        pending = {'nodes': [], 'calls': []}
+        while True:
+            item = self.queue.get()
+            if item is None:
+                self._flush(pending, 'nodes')
+                self._flush(pending, 'calls')
+                return
+
+            kind, rows = item
+            pending[kind].extend(rows)
+            if kind == 'calls':
+                self._flush(pending, 'nodes')
+            if len(pending[kind]) >= self.batch_size:
+                self._flush(pending, kind)
+
+    def _flush(self, pending, kind):
+        rows, pending[kind] = pending[kind], []
+        # After a failure keep draining the queue so producers never block
+        if not rows or self.error is not None:
+            return
+        try:
+            if kind == 'nodes':
+                self.db_connection.add_function_nodes_bulk(rows)
+            else:
+                self.db_connection.add_call_relationships_bulk(rows)
+        except Exception as e:
+            self.error = e
+
 # --- Part 2: Multi-Language Code Parsing ---
 
+# Grammars are loaded once at import, so pool workers and API threads share them
+_PY_LANG = Language(tspython.language())
+_JS_LANG = Language(tsjs.language())
+_TS_LANG = Language(tsts.language_typescript())
+_TSX_LANG = Language(tsts.language_tsx())
+
+LANGUAGES_BY_EXTENSION = {
+    '.py': (_PY_LANG, 'python'),
+    '.js': (_JS_LANG, 'javascript'),
+    '.jsx': (_JS_LANG, 'javascript'),
+    '.ts': (_TS_LANG, 'typescript'),
+    '.tsx': (_TSX_LANG, 'typescript')
+}
+
+# Parsers are not thread-safe, so each thread (e.g. concurrent API jobs) keeps its own
+_thread_parsers = threading.local()
+
+def _build_thread_parsers():
+    """extension -> (Parser, language_type) with one Parser per grammar (.js and .jsx share one)"""
+    parsers_by_language = {}
+    by_extension = {}
+    for extension, (language, language_type) in LANGUAGES_BY_EXTENSION.items():
+        parser = parsers_by_language.get(language)
+        if parser is None:
+            parser = parsers_by_language[language] = Parser(language)
+        by_extension[extension] = (parser, language_type)
+    return by_extension
+
 def get_parser_for_file(file_path):
     """Get the appropriate parser based on file extension"""
-    if file_path.endswith('.py'):
-        language = Language(tspython.language())
-        return Parser(language), 'python'
-    elif file_path.endswith('.js') or file_path.endswith('.jsx'):
-        language = Language(tsjs.language())
-        return Parser(language), 'javascript'
-    elif file_path.endswith('.ts'):
-        language = Language(tsts.language_typescript())
-        return Parser(language), 'typescript'
-    elif file_path.endswith('.tsx'):
-        language = Language(tsts.language_tsx())
-        return Parser(language), 'typescript'
-    return None, None
-
-def find_functions_and_calls_recursively(node, language_type='python'):
-    """Find functions and calls for multiple languages"""
-    results = {}
-    
-    # Language-specific function definition patterns
-    function_types = {
-        'python': ['function_definition'],
-        'javascript': ['function_declaration', 'arrow_function', 'method_definition'],
-        'typescript': ['function_declaration', 'arrow_function', 'method_definition', 'function_signature']
-    }
-    
-    # If the current node is a function definition
-    if node.type in function_types.get(language_type, []):
-        func_name = extract_function_name(node, language_type)
-        if func_name:
-            # Find all calls WITHIN this function
-            calls_in_body = find_calls_in_node(node, language_type)
-            results[func_name] = list(calls_in_body)
-
-    # Continue searching through children
-    for child in node.children:
-        child_results = find_functions_and_calls_recursively(child, language_type)
-        for func, calls in child_results.items():
-            if func not in results:
-                results[func] = []
-            results[func].extend(calls)
+    parsers = getattr(_thread_parsers, 'by_extension', None)
+    if parsers is None:
+        parsers = _thread_parsers.by_extension = _build_thread_parsers()
+    return parsers.get(os.path.splitext(file_path)[1], (None, None))
+
+# Query patterns for function definitions (@function/@name) and direct calls (@callee)
+FUNCTION_PATTERNS = {
+    'python': "(function_definition name: (identifier) @name) @function",
+    'javascript': (
+        "(function_declaration name: (_) @name) @function "
+        "(method_definition name: (_) @name) @function"
+    ),
+    'typescript': (
+        "(function_declaration name: (_) @name) @function "
+        "(method_definition name: (_) @name) @function"
+    )
+}
+
+CALL_PATTERNS = {
+    'python': "(call function: (identifier) @callee)",
+    'javascript': "(call_expression function: (identifier) @callee)",
+    'typescript': "(call_expression function: (identifier) @callee)"
+}
+
+# Compiled (function query, call query) pairs, keyed by grammar
+_QUERIES: Dict[Language, Tuple[Query, Query]] = {}
+
+def get_queries(language, language_type):
+    """Compile the function/call queries once per grammar (.ts and .tsx differ)"""
+    queries = _QUERIES.get(language)
+    if queries is None:
+        queries = (
+            Query(language, FUNCTION_PATTERNS[language_type]),
+            Query(language, CALL_PATTERNS[language_type])
+        )
+        _QUERIES[language] = queries
+    return queries
+
+def find_functions_and_calls(tree: Tree, language_type: str = 'python',
+                             source_code: Optional[Union[bytes, mmap.mmap]] = None) -> Dict[str, List[str]]:
+    """Find functions and the calls made inside each one, using tree-sitter queries
+
+    Pass the bytes (or buffer) the tree was parsed from as source_code to slice
+    identifiers straight out of it instead of going through node.text.
+    """
+    results: Dict[str, List[str]] = {}
+    if language_type not in FUNCTION_PATTERNS:
+        return results
+
+    function_query, call_query = get_queries(tree.language, language_type)
+    call_cursor = QueryCursor(call_query)
+
+    # Each distinct identifier is decoded once and interned; call-heavy files
+    # repeat the same few names many times
+    names: Dict[bytes, str] = {}
+    def identifier(node: Node) -> str:
+        if source_code is None:
+            # Only None for trees not parsed from a buffer, which never reach here
+            raw = cast(bytes, node.text)
+        else:
+            raw = source_code[node.start_byte:node.end_byte]
+        name = names.get(raw)
+        if name is None:
+            name = names[raw] = sys.intern(raw.decode('utf8'))
+        return name
+
+    # Matches come back in document order, so duplicate names merge the same way
+    # the old recursive walk did
+    for _, captures in QueryCursor(function_query).matches(tree.root_node):
+        func_name = identifier(captures['name'][0])
+        # Find all calls WITHIN this function
+        callees = call_cursor.captures(captures['function'][0]).get('callee', [])
+        calls_in_body = {identifier(callee) for callee in callees}
+        results.setdefault(func_name, []).extend(calls_in_body)
 
     return results
 
-def extract_function_name(node, language_type):
-    """Extract function name based on language type"""
-    if language_type == 'python':
-        name_node = node.child_by_field_name('name')
-        return name_node.text.decode('utf8') if name_node else None
-    
-    elif language_type in ['javascript', 'typescript']:
-        # Handle different JS/TS function patterns
-        if node.type == 'function_declaration':
-            name_node = node.child_by_field_name('name')
-            return name_node.text.decode('utf8') if name_node else None
-        elif node.type == 'method_definition':
-            name_node = node.child_by_field_name('name')
-            return name_node.text.decode('utf8') if name_node else None
-        elif node.type == 'arrow_function':
-            # Arrow functions might not have names, we'll skip them for now
-            return None
-    
-    return None
+# Version of the extraction code behind cached payloads (find_functions_and_calls,
+# find_docstrings and their helpers). Bump it whenever their output changes so
+# stale payloads in db/ast_cache.sqlite and .cache/parse.sqlite stop being served.
+# 2: Python docstrings sliced at their quote tokens (r-prefixes no longer kept)
+EXTRACTOR_VERSION = 2
 
-def find_calls_in_node(node, language_type='python'):
-    """Find function calls within a node for multiple languages"""
-    call_names = set()
-    
-    # Language-specific call patterns
-    call_types = {
-        'python': ['call'],
-        'javascript': ['call_expression'],
-        'typescript': ['call_expression']
-    }
-    
-    if node.type in call_types.get(language_type, []):
-        if language_type == 'python':
-            func_identifier_node = node.child_by_field_name('function')
-            if func_identifier_node and func_identifier_node.type == 'identifier':
-                call_names.add(func_identifier_node.text.decode('utf8'))
-        
-        elif language_type in ['javascript', 'typescript']:
-            func_identifier_node = node.child_by_field_name('function')
-            if func_identifier_node and func_identifier_node.type == 'identifier':
-                call_names.add(func_identifier_node.text.decode('utf8'))
-    
-    # Recursively search in children
-    for child in node.children:
-        call_names.update(find_calls_in_node(child, language_type))
-        
-    return call_names
+def get_grammar_version():
+    """Version tag for cached parse results; changes whenever a grammar or the extractor changes"""
+    versions = [f"extractor={EXTRACTOR_VERSION}"]
+    for package in ('tree-sitter', 'tree-sitter-python', 'tree-sitter-javascript', 'tree-sitter-typescript'):
+        try:
+            versions.append(f"{package}={metadata.version(package)}")
+        except metadata.PackageNotFoundError:
+            versions.append(f"{package}=unknown")
+    return ';'.join(versions)
+
+GRAMMAR_VERSION = get_grammar_version()
+PARSE_CACHE_PATH = os.path.join(os.getcwd(), '.cache', 'parse.sqlite')
+
+class CacheStore:
+    """SQLite cache of extracted parse results keyed by (path, sha256 of file bytes)"""
+
+    def __init__(self, path=PARSE_CACHE_PATH, grammar_ver=GRAMMAR_VERSION):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.grammar_ver = grammar_ver
+        self.conn = sqlite3.connect(path, timeout=30)
+        # WAL lets pool workers read while the main process writes
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS parse_cache ("
+            "path TEXT, content_hash BLOB, grammar_ver TEXT, payload BLOB, "
+            "PRIMARY KEY(path, content_hash))"
+        )
+        # Stat of each path when it was last stored, so unchanged files can be
+        # looked up without reading and hashing them
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS file_stats ("
+            "path TEXT PRIMARY KEY, mtime_ns INTEGER, size INTEGER, content_hash BLOB)"
+        )
+        self.conn.commit()
+
+    def get(self, path, content_hash):
+        row = self.conn.execute(
+            "SELECT payload FROM parse_cache WHERE path = ? AND content_hash = ? AND grammar_ver = ?",
+            (path, content_hash, self.grammar_ver)
+        ).fetchone()
+        return orjson.loads(row[0]) if row else None
+
+    def get_by_stat(self, path, mtime_ns, size):
+        """Payload for a file whose mtime and size still match those recorded by put()"""
+        row = self.conn.execute(
+            "SELECT p.payload FROM file_stats s "
+            "JOIN parse_cache p ON p.path = s.path AND p.content_hash = s.content_hash "
+            "WHERE s.path = ? AND s.mtime_ns = ? AND s.size = ? AND p.grammar_ver = ?",
+            (path, mtime_ns, size, self.grammar_ver)
+        ).fetchone()
+        return orjson.loads(row[0]) if row else None
+
+    def put(self, path, content_hash, payload, stat_key=None):
+        """Store a payload; stat_key is the file's (st_mtime_ns, st_size) to enable get_by_stat"""
+        # Only the current contents of a path are worth keeping: drop entries for its older
+        # versions (and, via the replace below, older grammars) so the cache doesn't only grow
+        self.conn.execute(
+            "DELETE FROM parse_cache WHERE path = ? AND content_hash != ?", (path, content_hash)
+        )
+        self.conn.execute(
+            "INSERT OR REPLACE INTO parse_cache (path, content_hash, grammar_ver, payload) VALUES (?, ?, ?, ?)",
+            (path, content_hash, self.grammar_ver, orjson.dumps(payload))
+        )
+        if stat_key is not None:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO file_stats (path, mtime_ns, size, content_hash) VALUES (?, ?, ?, ?)",
+                (path, stat_key[0], stat_key[1], content_hash)
+            )
+
+    def commit(self):
+        self.conn.commit()
+
+    def close(self):
+        self.conn.commit()
+        self.conn.close()
+
+# Read-only cache handle for pool workers, opened by init_parse_worker
+_worker_cache = None
+
+def init_parse_worker(cache_path=PARSE_CACHE_PATH):
+    global _worker_cache
+    _worker_cache = CacheStore(cache_path)
+
+# Files at least this big are parsed from a read-only mmap; below it the extra
+# mmap/munmap syscalls cost more than copying the file into bytes
+MMAP_MIN_SIZE = 64 * 1024
+
+@contextmanager
+def open_source(file_path: str) -> Iterator[Union[bytes, mmap.mmap]]:
+    """Contents of a source file: bytes for small files, a page-cache backed mmap for big ones"""
+    with open(file_path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size < MMAP_MIN_SIZE:
+            yield f.read()
+        else:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                yield mapped
+
+# Bytes that every function definition in a language contains; a file without them
+# has no functions (and so no docstrings) and is not parsed. JS/TS have no entry:
+# class and object methods are written without a keyword.
+DEFINITION_MARKERS = {'python': b'def'}
+
+def may_define_functions(source_code: Union[bytes, mmap.mmap], language_type: str) -> bool:
+    """False when the source cannot contain a function definition"""
+    marker = DEFINITION_MARKERS.get(language_type)
+    # find() rather than `in`, which does not search an mmap for a substring
+    return marker is None or source_code.find(marker) != -1
+
+def parse_file(file_path):
+    """Parse one file and return (file_path, language_type, {function: [calls]}, content_hash)
+
+    content_hash is only set on a cache miss, so the caller knows what to store.
+    """
+    # Runs inside pool workers, so it builds its own parser (Parser is not picklable)
+    parser, language_type = get_parser_for_file(file_path)
+    if parser is None:
+        return file_path, None, {}, None
+
+    # Node text points into the buffer, so extraction has to finish before it closes
+    with open_source(file_path) as source_code:
+        # Nothing to find in empty files, or Python files without a `def`
+        if len(source_code) == 0 or not may_define_functions(source_code, language_type):
+            return file_path, language_type, {}, None
+
+        content_hash = hashlib.sha256(source_code).digest()
+        if _worker_cache is not None:
+            found_items = _worker_cache.get(file_path, content_hash)
+            if found_items is not None:
+                return file_path, language_type, found_items, None
+
+        tree = parser.parse(source_code)
+        return file_path, language_type, find_functions_and_calls(tree, language_type, source_code), content_hash
 
 # --- Part 3: Main Execution Logic ---
 if __name__ == "__main__":
-    URI = "neo4j://localhost:7687"
+    URI = "bolt://localhost:7687"
     USER = "neo4j"
     PASSWORD = "neo4j-test-123"
     
     db_connection = Neo4jConnection(URI, USER, PASSWORD)
+    parse_cache = CacheStore()
     
     repo_path = os.path.join(os.getcwd(), 'temp', 'SpendWise')
     print(f"Starting to scan repository at: {repo_path}")
 
-    all_repo_functions = {}
-    supported_extensions = ['.py', '.js', '.jsx', '.ts', '.tsx']
+    # Call edges kept as parallel columns (one entry per edge) rather than a
+    # nested dict per file; names are interned since the same ones recur a lot
+    call_paths, call_callers, call_callees = [], [], []
+    writer = Neo4jBatchWriter(db_connection)
+
+    file_paths = [file_path for file_path, _ in iter_source_files(repo_path)]
 
     # Pass 1: Discover all functions and create nodes
+    # Files are parsed in parallel; the writer thread batches the Neo4j writes
     print("--- Pass 1: Discovering all functions and creating nodes ---")
-    for root, dirs, files in os.walk(repo_path):
-        for file in files:
-            if any(file.endswith(ext) for ext in supported_extensions):
-                file_path = os.path.join(root, file)
-                try:
-                    # Get the appropriate parser for this file type
-                    parser, language_type = get_parser_for_file(file_path)
-                    if parser is None:
-                        continue
-                    
-                    with open(file_path, 'rb') as f:
-                        source_code = f.read()
-                    
-                    tree = parser.parse(source_code)
-                    found_items = find_functions_and_calls_recursively(tree.root_node, language_type)
-                    
-                    if found_items:
-                        print(f"Processing {file_path} ({language_type})...")
-                        for func_name in found_items.keys():
-                            db_connection.add_function_node(file_path, func_name)
-                        
-                        all_repo_functions[file_path] = found_items
-
-                except Exception as e:
-                    print(f"Could not process {file_path}. Error: {e}")
+    with ProcessPoolExecutor(max_workers=os.cpu_count(), initializer=init_parse_worker) as executor:
+        futures = {executor.submit(parse_file, file_path): file_path for file_path in file_paths}
+        for future in as_completed(futures):
+            file_path = futures[future]
+            try:
+                _, language_type, found_items, content_hash = future.result()
+            except Exception as e:
+                print(f"Could not process {file_path}. Error: {e}")
+                continue
+
+            if content_hash is not None:
+                parse_cache.put(file_path, content_hash, found_items)
+
+            if found_items:
+                print(f"Processing {file_path} ({language_type})...")
+                writer.add_function_nodes([{"name": func_name, "path": file_path} for func_name in found_items])
+                # Same-named functions in one file (e.g. methods of two classes) repeat
+                # edges; MERGE would absorb them, but only after a wasted round-trip and
+                # index seek. Edges carry the file path and each file arrives once, so
+                # duplicates only need tracking within the file.
+                file_edges = set()
+                for func_name, calls in found_items.items():
+                    caller = sys.intern(func_name)
+                    for callee in calls:
+                        edge = (caller, sys.intern(callee))
+                        if edge in file_edges:
+                            continue
+                        file_edges.add(edge)
+                        call_paths.append(file_path)
+                        call_callers.append(caller)
+                        call_callees.append(edge[1])
 
     # Pass 2: Create relationships
     print("\n--- Pass 2: Creating call relationships ---")
-    for file_path, functions in all_repo_functions.items():
-        for caller, callees in functions.items():
-            for callee in callees:
-                db_connection.add_call_relationship(caller, callee, file_path)
+    for start in range(0, len(call_callers), BATCH_SIZE):
+        end = start + BATCH_SIZE
+        writer.add_call_relationships([
+            {"caller": caller, "callee": callee, "path": path}
+            for caller, callee, path in zip(call_callers[start:end], call_callees[start:end], call_paths[start:end])
+        ])
 
-    db_connection.close()
+    # close() re-raises a failed write; the parse results (committed on close) and
+    # the driver still get closed
+    try:
+        writer.close()
+    finally:
+        parse_cache.close()
+        db_connection.close()
     print("\nMulti-language graph building complete with relationships!")
\ No newline at end of file
@@ -0,0 +1,115 @@
+import os
+from typing import Dict, Tuple
+import orjson
+
+
+# Bump when the index layout changes so stale index files get rebuilt
+INDEX_VERSION = 1
+
+# Fields chat questions are matched against
+INDEX_FIELDS = ('filename', 'path', 'function', 'functionality')
+
+# index_file -> (st_mtime_ns, st_size, index), so chat requests don't re-parse an unchanged file
+_loaded_indexes: Dict[str, Tuple[int, int, dict]] = {}
+
+
+def file_name_of(file_path):
+    """Last path component of a stored relative path (handles Windows separators)"""
+    return file_path.split('\\')[-1] if '\\' in file_path else file_path.split('/')[-1]
+
+
+def trigrams(text):
+    """All 3-character substrings of text"""
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+def build_search_index(files, analysis_for):
+    """
+    Build the chat search index for one repository's file entries (see main.load_functions_file).
+    Every question keyword is longer than 2 characters, so a file can only contain it
+    if it contains all of its trigrams; posting lists map trigram -> file indices per field.
+    analysis_for(full_path) supplies the code analysis summary stored for each file.
+    """
+    analyses = []
+    postings = {field: {} for field in INDEX_FIELDS}
+
+    for file_idx, entry in enumerate(files):
+        analysis = analysis_for(entry['full'])
+        analyses.append(analysis)
+
+        function_grams = set()
+        for func_name in entry['functions']:
+            function_grams |= trigrams(func_name.lower())
+
+        field_grams = {
+            'filename': trigrams(entry['name'].lower()),
+            'path': trigrams(entry['rel'].lower()),
+            'function': function_grams,
+            'functionality': trigrams(analysis.lower()),
+        }
+        for field, grams in field_grams.items():
+            field_postings = postings[field]
+            for gram in grams:
+                field_postings.setdefault(gram, []).append(file_idx)
+
+    return {
+        'version': INDEX_VERSION,
+        'files': [entry['rel'] for entry in files],
+        'analysis': analyses,
+        'postings': postings,
+    }
+
+
+def save_search_index(index, index_file):
+    """Write the index next to the functions/docs files"""
+    with open(index_file, 'wb') as f:
+        f.write(orjson.dumps(index))
+
+
+def load_search_index(index_file, files, analysis_for):
+    """
+    Load the index for the file entries, rebuilding (and saving) it when it is missing,
+    from an older layout, or out of step with the functions file.
+    """
+    try:
+        st = os.stat(index_file)
+    except OSError:
+        st = None
+
+    if st is not None:
+        cached = _loaded_indexes.get(index_file)
+        if cached is not None and cached[:2] == (st.st_mtime_ns, st.st_size):
+            index = cached[2]
+        else:
+            with open(index_file, 'rb') as f:
+                index = orjson.loads(f.read())
+            _loaded_indexes[index_file] = (st.st_mtime_ns, st.st_size, index)
+        if index.get('version') == INDEX_VERSION and index.get('files') == [entry['rel'] for entry in files]:
+            return index
+
+    index = build_search_index(files, analysis_for)
+    save_search_index(index, index_file)
+    return index
+
+
+def candidate_files(index, field, keyword):
+    """
+    File indices whose field may contain keyword (a superset; callers still check with `in`).
+    keyword must be lowercase and at least 3 characters long.
+    """
+    field_postings = index['postings'][field]
+    posting_lists = []
+    for gram in trigrams(keyword):
+        file_ids = field_postings.get(gram)
+        if file_ids is None:
+            return set()
+        posting_lists.append(file_ids)
+
+    # Intersect starting from the rarest trigram to keep the working set small
+    posting_lists.sort(key=len)
+    result = set(posting_lists[0])
+    for file_ids in posting_lists[1:]:
+        result.intersection_update(file_ids)
+        if not result:
+            break
+    return result
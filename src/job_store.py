@@ -0,0 +1,70 @@
+import os
+import sqlite3
+
+
+# Per-job fields a JobStore can expose
+JOB_COLUMNS = ('status', 'repo_name', 'owner')
+
+
+class JobStore:
+    """
+    One column (e.g. 'status', 'repo_name' or 'owner') of the jobs table in db/jobs.sqlite.
+    The state lives on disk so it survives restarts and is shared with the worker
+    processes running analyses; supports the dict operations the endpoints use.
+    """
+
+    def __init__(self, path, column):
+        if column not in JOB_COLUMNS:
+            raise ValueError(f"Unknown job column: {column}")
+        self.path = path
+        self.column = column
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # WAL lets status polls read while a worker process writes
+        self._run("PRAGMA journal_mode=WAL")
+        self._run(f"CREATE TABLE IF NOT EXISTS jobs (id TEXT PRIMARY KEY, {', '.join(f'{name} TEXT' for name in JOB_COLUMNS)})")
+        # Databases created before a column existed get it added
+        existing = {row[1] for row in self._run("PRAGMA table_info(jobs)")}
+        if column not in existing:
+            try:
+                self._run(f"ALTER TABLE jobs ADD COLUMN {column} TEXT")
+            except sqlite3.OperationalError:
+                # Another process added it first
+                pass
+
+    def _run(self, query, parameters=()):
+        # A short-lived connection per call: the store is used from the event loop, executor
+        # callback threads and worker processes, and this keeps it trivially picklable
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            with conn:
+                return conn.execute(query, parameters).fetchall()
+        finally:
+            conn.close()
+
+    def __setitem__(self, job_id, value):
+        self._run(
+            f"INSERT INTO jobs (id, {self.column}) VALUES (?, ?) "
+            f"ON CONFLICT(id) DO UPDATE SET {self.column} = excluded.{self.column}",
+            (job_id, value)
+        )
+
+    def as_dict(self):
+        """Snapshot of every job that has this column set, oldest first"""
+        return dict(self._run(
+            f"SELECT id, {self.column} FROM jobs WHERE {self.column} IS NOT NULL ORDER BY rowid"
+        ))
+
+    def get(self, job_id, default=None):
+        rows = self._run(
+            f"SELECT {self.column} FROM jobs WHERE id = ? AND {self.column} IS NOT NULL", (job_id,)
+        )
+        return rows[0][0] if rows else default
+
+    def __getitem__(self, job_id):
+        value = self.get(job_id)
+        if value is None:
+            raise KeyError(job_id)
+        return value
+
+    def __contains__(self, job_id):
+        return self.get(job_id) is not None
@@ -1,21 +1,68 @@
 import os
 import sys
-from fastapi import FastAPI, BackgroundTasks
+from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import Response, StreamingResponse
 from pydantic import BaseModel
 import git
 import threading
 import uuid
-import json
+import shutil
+import orjson
+import ahocorasick
+import hashlib
+import functools
+from collections import deque
+from itertools import islice
+from typing import Dict, List, Optional
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import asynccontextmanager
 
 # Add the src directory to the path so we can import modules
 sys.path.append(os.path.dirname(__file__))
 
-from graph_builder import get_parser_for_file, find_functions_and_calls_recursively
-from vector_builder import find_docstrings_recursively
+from graph_builder import get_parser_for_file, find_functions_and_calls, iter_source_files, open_source, may_define_functions, CacheStore
+from vector_builder import find_docstrings
+from job_store import JobStore
+from index_builder import build_search_index, save_search_index, load_search_index, candidate_files, file_name_of
+
+# Analyses run out of the server process, at most two at a time
+ANALYSIS_WORKERS = 2
+ANALYSIS_EXECUTOR = ProcessPoolExecutor(max_workers=ANALYSIS_WORKERS)
+
+# Statuses a job never leaves; anything else means an analysis is queued or running
+FINAL_JOB_STATUSES = ('complete', 'failed')
+
+def _owner_alive(owner):
+    """Whether the server process that submitted a job (its recorded pid) is still running"""
+    if owner is None or int(owner) == os.getpid():
+        # Unowned rows predate owners; a job can't be ours before we start serving, so our
+        # pid means the previous process had it too (e.g. pid 1 across container restarts)
+        return False
+    try:
+        os.kill(int(owner), 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        # Exists, but belongs to another user
+        return True
+    return True
+
+@asynccontextmanager
+async def lifespan(app):
+    # Statuses outlive restarts, but the analyses of a previous server process don't:
+    # close out its queued/processing jobs so clients stop polling them. Jobs of sibling
+    # workers (uvicorn --workers N shares the database) are still running and left alone.
+    for job_id, status in job_statuses.as_dict().items():
+        if status not in FINAL_JOB_STATUSES and not _owner_alive(job_owners.get(job_id)):
+            job_statuses[job_id] = "failed"
+    yield
+    # Don't let queued analyses hold up shutdown
+    ANALYSIS_EXECUTOR.shutdown(wait=False, cancel_futures=True)
 
 # Create FastAPI app instance
-app = FastAPI(title="Repository Knowledge Graph API", version="1.0.0")
+app = FastAPI(title="Repository Knowledge Graph API", version="1.0.0", lifespan=lifespan)
 
 # Add CORS middleware
 app.add_middleware(
@@ -26,14 +73,200 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Global job status tracking
-job_statuses = {}
-job_repo_mapping = {}  # Track which repo each job is analyzing
+# Job status tracking, shared with the analysis worker processes
+JOBS_DB = os.path.join(os.getcwd(), 'db', 'jobs.sqlite')
+job_statuses = JobStore(JOBS_DB, 'status')
+job_repo_mapping = JobStore(JOBS_DB, 'repo_name')  # Track which repo each job is analyzing
+job_owners = JobStore(JOBS_DB, 'owner')  # pid of the server process whose pool runs the job
 
 # Request models
 class RepositoryRequest(BaseModel):
     repo_url: str
 
+# What analyze_code_content reports, in output order: (title, trigger keywords, buckets).
+# A category is only considered when one of its triggers occurs in the file (None: always),
+# and then lists the label of every bucket with at least one keyword present.
+ANALYSIS_CATEGORIES = (
+    ("UI Component handling",
+     frozenset(['jsx', 'tsx', 'component', 'react', 'return (', 'usestate', 'useeffect']), (
+         (frozenset(['usestate']), "state management"),
+         (frozenset(['useeffect']), "side effects/lifecycle"),
+         (frozenset(['onclick', 'onchange']), "user interactions"),
+         (frozenset(['form']), "forms"),
+         (frozenset(['button']), "buttons/actions"),
+         (frozenset(['input']), "user input"),
+         (frozenset(['fetch', 'api']), "API calls"),
+     )),
+    ("API/Backend functionality",
+     frozenset(['route', 'post', 'get', 'put', 'delete', 'request', 'response']), (
+         (frozenset(['post']), "POST requests"),
+         (frozenset(['get']), "GET requests"),
+         (frozenset(['auth']), "authentication"),
+         (frozenset(['database', 'db']), "database operations"),
+     )),
+    ("Data processing",
+     frozenset(['json', 'data', 'array', 'object', 'map', 'filter', 'reduce']), (
+         (frozenset(['json']), "JSON processing"),
+         (frozenset(['map']), "data transformation"),
+         (frozenset(['filter']), "data filtering"),
+         (frozenset(['sort']), "data sorting"),
+     )),
+    # Business logic patterns
+    ("Business logic", None, (
+        (frozenset(['auth']), 'authentication/authorization'),
+        (frozenset(['login']), 'user login'),
+        (frozenset(['signup']), 'user registration'),
+        (frozenset(['dashboard']), 'main interface'),
+        (frozenset(['spending']), 'expense tracking'),
+        (frozenset(['budget']), 'budget management'),
+        (frozenset(['chart']), 'data visualization'),
+        (frozenset(['theme']), 'UI theming'),
+        (frozenset(['settings']), 'configuration'),
+        (frozenset(['profile']), 'user profile'),
+    )),
+)
+
+def _build_keyword_automaton():
+    """Aho-Corasick automaton over every analysis keyword, so one pass over a file finds all of them"""
+    automaton = ahocorasick.Automaton()
+    keywords = set()
+    for _, triggers, buckets in ANALYSIS_CATEGORIES:
+        keywords |= triggers or frozenset()
+        for bucket_keywords, _ in buckets:
+            keywords |= bucket_keywords
+    for keyword in keywords:
+        automaton.add_word(keyword, keyword)
+    automaton.make_automaton()
+    return automaton, max(map(len, keywords))
+
+KEYWORD_AUTOMATON, KEYWORD_MAX_LENGTH = _build_keyword_automaton()
+
+# Source text is lowercased and scanned this many characters at a time, so a big file
+# never needs a second, lowercased copy of all of it
+ANALYSIS_CHUNK_SIZE = 1 << 20
+
+def _keyword_hits(file_path):
+    """The analysis keywords k for which `k in content.lower()` holds for the file's text"""
+    hits = set()
+    # Consecutive chunks overlap by one character less than the longest keyword,
+    # so keywords spanning a chunk boundary are still seen
+    overlap = KEYWORD_MAX_LENGTH - 1
+    carry = ''
+    with open(file_path, 'r', encoding='utf-8') as f:
+        while True:
+            chunk = f.read(ANALYSIS_CHUNK_SIZE)
+            if not chunk:
+                return hits
+            text = carry + chunk.lower()
+            # The automaton reports overlapping matches, so nothing is shadowed
+            hits.update(keyword for _, keyword in KEYWORD_AUTOMATON.iter(text))
+            carry = text[-overlap:]
+
+@functools.lru_cache(maxsize=4096)
+def analyze_code_content(file_path, mtime_ns, size):
+    """
+    Analyze what the code actually does.
+    mtime_ns and size only key the cache, so an edited file is re-read; use file_analysis() to call this.
+    """
+    try:
+        try:
+            hits = _keyword_hits(file_path)
+        except UnicodeDecodeError:
+            # Decode the whole file so the error names the absolute byte position
+            with open(file_path, 'r', encoding='utf-8') as f:
+                f.read()
+            raise
+        
+        # Determine what this file does based on content analysis
+        analysis = []
+        for title, triggers, buckets in ANALYSIS_CATEGORIES:
+            if triggers is not None and hits.isdisjoint(triggers):
+                continue
+            found = [label for bucket_keywords, label in buckets if not hits.isdisjoint(bucket_keywords)]
+            if found:
+                analysis.append(f"{title}: {', '.join(found)}")
+        
+        return "; ".join(analysis) if analysis else "General utility/helper functionality"
+        
+    except Exception as e:
+        return f"Analysis error: {str(e)}"
+
+def file_analysis(file_path):
+    """Cached analyze_code_content for the file's current version"""
+    try:
+        st = os.stat(file_path)
+    except OSError:
+        return "File not accessible"
+    return analyze_code_content(file_path, st.st_mtime_ns, st.st_size)
+
+# Abort clones/fetches that stay below 1KB/s for 10 seconds instead of hanging the job
+GIT_TRANSFER_ENV = {'GIT_HTTP_LOW_SPEED_LIMIT': '1000', 'GIT_HTTP_LOW_SPEED_TIME': '10'}
+
+# Repos with more candidate files than this are parsed in a process pool
+PARALLEL_FILE_THRESHOLD = 32
+
+# Read handle on the AST cache inside pool workers (see _init_analysis_worker)
+_ast_cache = None
+
+def _init_analysis_worker(cache_path: str):
+    global _ast_cache
+    _ast_cache = CacheStore(cache_path)
+
+def _cache_key(local_path: str, relative_path: str) -> str:
+    """AST cache key for a file: db/ast_cache.sqlite is shared by every analyzed repo,
+    and paths like setup.py or src/__init__.py recur across them"""
+    return os.path.basename(local_path) + '/' + relative_path
+
+def _analyze_one_file(file_path: str, local_path: str, stat_key: Optional[tuple] = None, cache: Optional[CacheStore] = None):
+    """
+    Parse one file once and extract both functions/calls and docstrings.
+    Returns (relative_path, language_type, functions, docs, content_hash, error, doc_error).
+    stat_key is the file's (st_mtime_ns, st_size) from the directory walk.
+    content_hash is only set when the cache should be updated: a new result, or a
+    cached one found by hash whose stat changed (e.g. after a fresh clone).
+    Runs in pool workers, so errors are returned instead of raised to keep the other files going.
+    doc_error only loses the file's docs: its functions are still returned (and not cached).
+    """
+    relative_path = os.path.relpath(file_path, local_path)
+    cache_key = _cache_key(local_path, relative_path)
+    try:
+        # Each worker process keeps its own cached parser per extension
+        parser, language_type = get_parser_for_file(file_path)
+        if parser is None:
+            return relative_path, None, {}, {}, None, None, None
+
+        # Files untouched since they were cached are not even read
+        cache = cache if cache is not None else _ast_cache
+        if cache is not None and stat_key is not None:
+            cached = cache.get_by_stat(cache_key, *stat_key)
+            if cached is not None:
+                return relative_path, language_type, cached['functions'], cached['docs'], None, None, None
+
+        # Big files are mmapped; both extractions read node text, so they run before it closes
+        with open_source(file_path) as source_code:
+            content_hash = hashlib.sha256(source_code).digest()
+            # Files that cannot define a function have nothing for either extraction;
+            # the empty result is still stored so reruns skip them by stat too
+            if not may_define_functions(source_code, language_type):
+                return relative_path, language_type, {}, {}, content_hash, None, None
+
+            # Unchanged files skip parsing and both tree walks
+            if cache is not None:
+                cached = cache.get(cache_key, content_hash)
+                if cached is not None:
+                    return relative_path, language_type, cached['functions'], cached['docs'], content_hash, None, None
+
+            tree = parser.parse(source_code)
+            found_items = find_functions_and_calls(tree, language_type, source_code)
+            try:
+                docs = find_docstrings(tree, language_type)
+            except Exception as e:
+                # e.g. a docstring that is not valid UTF-8; keep the functions as before
+                return relative_path, language_type, found_items, {}, None, None, str(e)
+        return relative_path, language_type, found_items, docs, content_hash, None, None
+    except Exception as e:
+        return relative_path, None, {}, {}, None, str(e), None
+
 # The function signature is now updated to accept the new arguments
 def run_analysis_pipeline(repo_url: str, job_id: str, job_statuses: dict):
     """
@@ -46,93 +279,117 @@ def run_analysis_pipeline(repo_url: str, job_id: str, job_statuses: dict):
         repo_name = repo_url.split("/")[-1].replace(".git", "")
         local_path = os.path.join(os.getcwd(), 'temp', repo_name)
         
-        if os.path.exists(local_path):
+        if os.path.isdir(os.path.join(local_path, '.git')):
+            print(f"Repository already exists at {local_path}. Fetching latest commit.")
+            try:
+                # Shallow history can't be merged, so move the working tree to the fetched tip.
+                # Fetching the remote's HEAD alone makes FETCH_HEAD that commit even when the
+                # configured refspec fetches every branch, and works on a detached HEAD too
+                repo = git.Repo(local_path)
+                with repo.git.custom_environment(**GIT_TRANSFER_ENV):
+                    repo.remotes.origin.fetch('HEAD', depth=1, no_tags=True)
+                repo.git.reset('--hard', 'FETCH_HEAD')
+            except Exception as e:
+                print(f"--- [WORKER {job_id}] Could not update {local_path}, using existing checkout: {e} ---")
+        elif os.path.exists(local_path):
             print(f"Repository already exists at {local_path}. Skipping clone.")
         else:
-            git.Repo.clone_from(repo_url, local_path)
+            # Only HEAD's working tree is analyzed: skip history and tags, and fetch blobs lazily
+            try:
+                git.Repo.clone_from(repo_url, local_path, depth=1, single_branch=True,
+                                    multi_options=['--filter=blob:none', '--no-tags'], env=GIT_TRANSFER_ENV)
+            except git.GitCommandError as e:
+                # Some servers reject partial clone; retry as a plain shallow clone
+                print(f"--- [WORKER {job_id}] Partial clone failed, retrying without --filter: {e} ---")
+                shutil.rmtree(local_path, ignore_errors=True)
+                git.Repo.clone_from(repo_url, local_path, depth=1, single_branch=True,
+                                    multi_options=['--no-tags'], env=GIT_TRANSFER_ENV)
         print(f"--- [WORKER {job_id}] Cloning complete. ---")
 
-        # === Step 2: Function Analysis (No Neo4j needed) ===
+        # === Step 2: Function and Documentation Analysis (No Neo4j needed) ===
         job_statuses[job_id] = "processing: analyzing functions"
-        print(f"--- [WORKER {job_id}] Step 2/3: Analyzing functions and calls... ---")
+        print(f"--- [WORKER {job_id}] Step 2/3: Analyzing functions, calls and documentation... ---")
         
-        supported_extensions = ['.py', '.js', '.jsx', '.ts', '.tsx']
-        all_repo_functions = {}
+        all_repo_files = []
+        all_docs = {}
         function_count = 0
+        doc_count = 0
+
+        source_files = list(iter_source_files(local_path))
+        file_paths = [file_path for file_path, _ in source_files]
+        stat_keys = [(st.st_mtime_ns, st.st_size) for _, st in source_files]
+
+        # Per-file results keyed by content hash, shared across analyze runs
+        cache_path = os.path.join(os.getcwd(), 'db', 'ast_cache.sqlite')
+        ast_cache = CacheStore(cache_path)
+
+        # Parsing is CPU-bound and independent per file; spread big repos over all
+        # cores, but skip the pool start-up cost for small ones
+        if len(file_paths) > PARALLEL_FILE_THRESHOLD:
+            with ProcessPoolExecutor(max_workers=os.cpu_count(), initializer=_init_analysis_worker,
+                                     initargs=(cache_path,)) as executor:
+                results = list(executor.map(_analyze_one_file, file_paths, [local_path] * len(file_paths),
+                                            stat_keys, chunksize=16))
+        else:
+            results = [_analyze_one_file(file_path, local_path, stat_key, ast_cache)
+                       for file_path, stat_key in zip(file_paths, stat_keys)]
 
-        for root, dirs, files in os.walk(local_path):
-            for file in files:
-                if any(file.endswith(ext) for ext in supported_extensions):
-                    file_path = os.path.join(root, file)
-                    try:
-                        parser, language_type = get_parser_for_file(file_path)
-                        if parser is None:
-                            continue
-                        
-                        with open(file_path, 'rb') as f:
-                            source_code = f.read()
-                        tree = parser.parse(source_code)
-                        found_items = find_functions_and_calls_recursively(tree.root_node, language_type)
-                        
-                        if found_items:
-                            relative_path = os.path.relpath(file_path, local_path)
-                            all_repo_functions[relative_path] = {
-                                'language': language_type,
-                                'functions': found_items,
-                                'full_path': file_path
-                            }
-                            function_count += len(found_items)
-                            print(f"--- [WORKER {job_id}] Found {len(found_items)} functions in {relative_path} ({language_type}) ---")
-                            
-                    except Exception as e:
-                        print(f"--- [WORKER {job_id}] Error processing {file_path}: {e} ---")
+        for file_path, stat_key, (relative_path, language_type, found_items, docs, content_hash, error, doc_error) in zip(
+                file_paths, stat_keys, results):
+            if error is not None:
+                print(f"--- [WORKER {job_id}] Error processing {file_path}: {error} ---")
+                continue
+            if doc_error is not None:
+                print(f"--- [WORKER {job_id}] Error processing {file_path} for docs: {doc_error} ---")
+
+            if content_hash is not None:
+                ast_cache.put(_cache_key(local_path, relative_path), content_hash, {'functions': found_items, 'docs': docs}, stat_key)
+
+            if found_items:
+                # Everything chat and the graph need per file, so nothing is re-derived per request
+                all_repo_files.append({
+                    'rel': relative_path,
+                    'full': file_path,
+                    'name': file_name_of(relative_path),
+                    'lang': language_type,
+                    'functions': found_items
+                })
+                function_count += len(found_items)
+                print(f"--- [WORKER {job_id}] Found {len(found_items)} functions in {relative_path} ({language_type}) ---")
+
+            if docs:
+                all_docs[relative_path] = {
+                    'language': language_type,
+                    'docs': docs
+                }
+                doc_count += len(docs)
+
+        # All new cache entries land in a single commit
+        ast_cache.close()
 
         # Save function data to JSON file for later querying
         functions_file = os.path.join(os.getcwd(), 'db', f'{repo_name}_functions.json')
         os.makedirs(os.path.dirname(functions_file), exist_ok=True)
-        with open(functions_file, 'w') as f:
-            json.dump(all_repo_functions, f, indent=2)
+        with open(functions_file, 'wb') as f:
+            f.write(orjson.dumps({'files': all_repo_files}, option=orjson.OPT_INDENT_2))
         
-        print(f"--- [WORKER {job_id}] Analyzed {function_count} functions across {len(all_repo_functions)} files ---")
+        print(f"--- [WORKER {job_id}] Analyzed {function_count} functions across {len(all_repo_files)} files ---")
 
-        # === Step 3: Documentation Extraction (Simplified) ===
+        # === Step 3: Documentation Output ===
         job_statuses[job_id] = "processing: extracting documentation"
-        print(f"--- [WORKER {job_id}] Step 3/3: Extracting documentation... ---")
-
-        doc_count = 0
-        all_docs = {}
-        
-        for root, dirs, files in os.walk(local_path):
-            for file in files:
-                if any(file.endswith(ext) for ext in supported_extensions):
-                    file_path = os.path.join(root, file)
-                    try:
-                        parser, language_type = get_parser_for_file(file_path)
-                        if parser is None:
-                            continue
-                            
-                        with open(file_path, 'rb') as f:
-                            source_code = f.read()
-                        
-                        docs = find_docstrings_recursively(parser.parse(source_code).root_node, language_type)
-                        if docs:
-                            relative_path = os.path.relpath(file_path, local_path)
-                            all_docs[relative_path] = {
-                                'language': language_type,
-                                'docs': docs
-                            }
-                            doc_count += len(docs)
-                            
-                    except Exception as e:
-                        print(f"--- [WORKER {job_id}] Error processing {file_path} for docs: {e} ---")
+        print(f"--- [WORKER {job_id}] Step 3/3: Saving documentation... ---")
 
         # Save documentation data
         docs_file = os.path.join(os.getcwd(), 'db', f'{repo_name}_docs.json')
-        with open(docs_file, 'w') as f:
-            json.dump(all_docs, f, indent=2)
+        with open(docs_file, 'wb') as f:
+            f.write(orjson.dumps(all_docs, option=orjson.OPT_INDENT_2))
         
         print(f"--- [WORKER {job_id}] Extracted {doc_count} documented functions ---")
         
+        # Inverted index for chat keyword matching
+        index_file = os.path.join(os.getcwd(), 'db', f'{repo_name}_index.json')
+        save_search_index(build_search_index(all_repo_files, file_analysis), index_file)
+        
         # This is the final, crucial update
         job_statuses[job_id] = "complete"
         print(f"--- [WORKER {job_id}] Vector index complete. ---")
@@ -143,6 +400,102 @@ def run_analysis_pipeline(repo_url: str, job_id: str, job_statuses: dict):
         print(f"--- [WORKER {job_id}] An error occurred: {e} ---")
 
 
+# Graphs with more functions than this are streamed instead of serialized in one go
+GRAPH_STREAM_THRESHOLD = 50000
+
+# Nodes/edges serialized per streamed chunk
+GRAPH_STREAM_CHUNK = 1000
+
+def load_functions_file(functions_file):
+    """
+    Per-file entries {'rel', 'full', 'name', 'lang', 'functions'} from a functions JSON file.
+    Files from before the 'files' list layout (a dict keyed by relative path) are converted.
+    """
+    with open(functions_file, 'rb') as f:
+        data = orjson.loads(f.read())
+    if isinstance(data.get('files'), list):
+        return data['files']
+    return [{
+        'rel': file_path,
+        'full': file_data.get('full_path', file_path),
+        'name': file_name_of(file_path),
+        'lang': file_data['language'],
+        'functions': file_data['functions']
+    } for file_path, file_data in data.items()]
+
+def _graph_nodes(files):
+    """Function nodes in the graph format used for visualization"""
+    for entry in files:
+        file_path = entry['rel']
+        language = entry['lang']
+        for func_name in entry['functions']:
+            yield {
+                "id": f"{file_path}::{func_name}",
+                "label": func_name,
+                "file": file_path,
+                "language": language,
+                "type": "function"
+            }
+
+def _graph_edges(files):
+    """One edge per function call"""
+    for entry in files:
+        file_path = entry['rel']
+        for func_name, calls in entry['functions'].items():
+            source = f"{file_path}::{func_name}"
+            for call in calls:
+                yield {
+                    "from": source,
+                    "to": call,
+                    "type": "calls"
+                }
+
+def _json_array_items(items):
+    """Comma-joined orjson fragments for the body of a JSON array, GRAPH_STREAM_CHUNK items at a time"""
+    separator = b''
+    batch = []
+    for item in items:
+        batch.append(orjson.dumps(item))
+        if len(batch) == GRAPH_STREAM_CHUNK:
+            yield separator + b','.join(batch)
+            separator = b','
+            batch = []
+    if batch:
+        yield separator + b','.join(batch)
+
+def _graph_json_chunks(files, summary):
+    """The get_graph_data response body as a stream of JSON fragments"""
+    yield b'{"nodes":['
+    yield from _json_array_items(_graph_nodes(files))
+    yield b'],"edges":['
+    yield from _json_array_items(_graph_edges(files))
+    yield b'],"summary":' + orjson.dumps(summary) + b'}'
+
+def submit_analysis(repo_url: str, job_id: str):
+    """Queue run_analysis_pipeline on the analysis executor"""
+    global ANALYSIS_EXECUTOR
+    try:
+        try:
+            future = ANALYSIS_EXECUTOR.submit(run_analysis_pipeline, repo_url, job_id, job_statuses)
+        except BrokenProcessPool:
+            # A worker process that died (e.g. OOM-killed) breaks the whole pool for good;
+            # replace it so this and later jobs still run
+            ANALYSIS_EXECUTOR.shutdown(wait=False, cancel_futures=True)
+            ANALYSIS_EXECUTOR = ProcessPoolExecutor(max_workers=ANALYSIS_WORKERS)
+            future = ANALYSIS_EXECUTOR.submit(run_analysis_pipeline, repo_url, job_id, job_statuses)
+    except Exception:
+        # Never leave a job queued that no worker will pick up
+        job_statuses[job_id] = "failed"
+        raise
+
+    def mark_failed(done):
+        # The pipeline records its own errors; this covers a worker process dying
+        # and queued jobs cancelled at shutdown, which never started
+        if done.cancelled() or done.exception() is not None:
+            job_statuses[job_id] = "failed"
+    future.add_done_callback(mark_failed)
+
+
 # FastAPI endpoints
 @app.get("/")
 async def root():
@@ -150,13 +503,15 @@ async def root():
     return {"message": "Repository Knowledge Graph API is running"}
 
 @app.post("/analyze")
-async def analyze_repository(request: RepositoryRequest, background_tasks: BackgroundTasks):
+async def analyze_repository(request: RepositoryRequest):
     """Start repository analysis"""
     job_id = str(uuid.uuid4())
+    # Owner first, so another worker's startup never sees the job unowned
+    job_owners[job_id] = os.getpid()
     job_statuses[job_id] = "queued"
     
-    # Run analysis in background
-    background_tasks.add_task(run_analysis_pipeline, request.repo_url, job_id, job_statuses)
+    # Run analysis in a worker process
+    submit_analysis(request.repo_url, job_id)
     
     return {
         "message": "Analysis started", 
@@ -167,35 +522,38 @@ async def analyze_repository(request: RepositoryRequest, background_tasks: Backg
 @app.get("/status/{job_id}")
 async def get_job_status(job_id: str):
     """Get job status"""
-    if job_id not in job_statuses:
+    status = job_statuses.get(job_id)
+    if status is None:
         return {"error": "Job not found"}, 404
     
     return {
         "job_id": job_id,
-        "status": job_statuses[job_id]
+        "status": status
     }
 
 @app.get("/jobs")
 async def list_jobs():
     """List all jobs and their statuses"""
-    return {"jobs": job_statuses}
+    return {"jobs": job_statuses.as_dict()}
 
 # Frontend-compatible endpoints
 @app.post("/api/v1/ingest")
-async def ingest_repository(request: RepositoryRequest, background_tasks: BackgroundTasks):
+async def ingest_repository(request: RepositoryRequest):
     """Start repository analysis (frontend-compatible endpoint)"""
     print(f"Received ingest request: {request}")
     print(f"Repository URL: {request.repo_url}")
     
     job_id = str(uuid.uuid4())
+    # Owner first, so another worker's startup never sees the job unowned
+    job_owners[job_id] = os.getpid()
     job_statuses[job_id] = "queued"
     
     # Extract repo name from URL
     repo_name = request.repo_url.split('/')[-1]
     job_repo_mapping[job_id] = repo_name
     
-    # Run analysis in background
-    background_tasks.add_task(run_analysis_pipeline, request.repo_url, job_id, job_statuses)
+    # Run analysis in a worker process
+    submit_analysis(request.repo_url, job_id)
     
     return {
         "message": "Analysis started", 
@@ -212,12 +570,13 @@ async def ingest_repository(request: RepositoryRequest, background_tasks: Backgr
 @app.get("/api/v1/ingest/status/{job_id}")
 async def get_ingest_status(job_id: str):
     """Get job status (frontend-compatible endpoint)"""
-    if job_id not in job_statuses:
+    status = job_statuses.get(job_id)
+    if status is None:
         return {"error": "Job not found"}, 404
     
     return {
         "job_id": job_id,
-        "status": job_statuses[job_id],
+        "status": status,
         "repo_name": job_repo_mapping.get(job_id, "unknown")
     }
 
@@ -229,41 +588,31 @@ async def get_graph_data(repo_name: str):
     if not os.path.exists(functions_file):
         return {"error": "Graph data not found"}, 404
     
-    with open(functions_file, 'r') as f:
-        functions_data = json.load(f)
+    files = load_functions_file(functions_file)
     
-    # Convert to graph format for visualization
-    nodes = []
-    edges = []
+    # Totals up front, so the summary can be written before or after the lists
+    total_functions = 0
+    total_calls = 0
+    for entry in files:
+        total_functions += len(entry['functions'])
+        for calls in entry['functions'].values():
+            total_calls += len(calls)
+    summary = {
+        "total_functions": total_functions,
+        "total_files": len(files),
+        "total_calls": total_calls
+    }
     
-    for file_path, file_data in functions_data.items():
-        for func_name, calls in file_data['functions'].items():
-            # Add function node
-            nodes.append({
-                "id": f"{file_path}::{func_name}",
-                "label": func_name,
-                "file": file_path,
-                "language": file_data['language'],
-                "type": "function"
-            })
-            
-            # Add edges for function calls
-            for call in calls:
-                edges.append({
-                    "from": f"{file_path}::{func_name}",
-                    "to": call,
-                    "type": "calls"
-                })
+    # Big graphs are streamed so the serialized body is never held in memory at once
+    if total_functions > GRAPH_STREAM_THRESHOLD:
+        return StreamingResponse(_graph_json_chunks(files, summary), media_type="application/json")
     
-    return {
-        "nodes": nodes,
-        "edges": edges,
-        "summary": {
-            "total_functions": len(nodes),
-            "total_files": len(functions_data),
-            "total_calls": len(edges)
-        }
-    }
+    # Serialize with orjson directly instead of going through jsonable_encoder
+    return Response(orjson.dumps({
+        "nodes": list(_graph_nodes(files)),
+        "edges": list(_graph_edges(files)),
+        "summary": summary
+    }), media_type="application/json")
 
 @app.post("/api/v1/chat/{repo_name}")
 async def chat_with_repo(repo_name: str, query: dict):
@@ -280,14 +629,13 @@ async def chat_with_repo(repo_name: str, query: dict):
     if not os.path.exists(functions_file):
         return {"error": "Repository data not found"}, 404
     
-    with open(functions_file, 'r') as f:
-        functions_data = json.load(f)
+    files = load_functions_file(functions_file)
     
     # Load documentation data if available
     docs_data = {}
     if os.path.exists(docs_file):
-        with open(docs_file, 'r') as f:
-            docs_data = json.load(f)
+        with open(docs_file, 'rb') as f:
+            docs_data = orjson.loads(f.read())
     
     # Helper function to read source code content
     def get_source_code_snippet(file_path, max_lines=50):
@@ -295,163 +643,78 @@ async def chat_with_repo(repo_name: str, query: dict):
         try:
             if os.path.exists(file_path):
                 with open(file_path, 'r', encoding='utf-8') as f:
-                    lines = f.readlines()
-                    if len(lines) <= max_lines:
-                        return ''.join(lines)
-                    else:
-                        # Return first 30 lines and last 10 lines with separator
-                        start_part = ''.join(lines[:30])
-                        end_part = ''.join(lines[-10:])
-                        return f"{start_part}\n\n... (file continues) ...\n\n{end_part}"
+                    # Stream the file: keep at most max_lines head lines plus a 10-line tail
+                    head = list(islice(f, max_lines))
+                    rest = deque(f, maxlen=10)
+                if not rest:
+                    return ''.join(head)
+                # Return first 30 lines and last 10 lines with separator
+                start_part = ''.join(head[:30])
+                end_part = ''.join((head + list(rest))[-10:])
+                return f"{start_part}\n\n... (file continues) ...\n\n{end_part}"
         except Exception as e:
             return f"Could not read file: {str(e)}"
         return "File not found"
     
-    # Enhanced analysis function
-    def analyze_code_content(file_path, functions_info):
-        """Analyze what the code actually does"""
-        try:
-            if not os.path.exists(file_path):
-                return "File not accessible"
-                
-            with open(file_path, 'r', encoding='utf-8') as f:
-                content = f.read().lower()
-            
-            # Determine what this file does based on content analysis
-            analysis = []
-            
-            # UI/Component analysis
-            if any(keyword in content for keyword in ['jsx', 'tsx', 'component', 'react', 'return (', 'usestate', 'useeffect']):
-                ui_patterns = []
-                if 'usestate' in content:
-                    ui_patterns.append("state management")
-                if 'useeffect' in content:
-                    ui_patterns.append("side effects/lifecycle")
-                if 'onclick' in content or 'onchange' in content:
-                    ui_patterns.append("user interactions")
-                if 'form' in content:
-                    ui_patterns.append("forms")
-                if 'button' in content:
-                    ui_patterns.append("buttons/actions")
-                if 'input' in content:
-                    ui_patterns.append("user input")
-                if 'fetch' in content or 'api' in content:
-                    ui_patterns.append("API calls")
-                    
-                if ui_patterns:
-                    analysis.append(f"UI Component handling: {', '.join(ui_patterns)}")
-            
-            # API/Backend analysis
-            if any(keyword in content for keyword in ['route', 'post', 'get', 'put', 'delete', 'request', 'response']):
-                api_patterns = []
-                if 'post' in content:
-                    api_patterns.append("POST requests")
-                if 'get' in content:
-                    api_patterns.append("GET requests")
-                if 'auth' in content:
-                    api_patterns.append("authentication")
-                if 'database' in content or 'db' in content:
-                    api_patterns.append("database operations")
-                    
-                if api_patterns:
-                    analysis.append(f"API/Backend functionality: {', '.join(api_patterns)}")
-            
-            # Data handling
-            if any(keyword in content for keyword in ['json', 'data', 'array', 'object', 'map', 'filter', 'reduce']):
-                data_patterns = []
-                if 'json' in content:
-                    data_patterns.append("JSON processing")
-                if 'map' in content:
-                    data_patterns.append("data transformation")
-                if 'filter' in content:
-                    data_patterns.append("data filtering")
-                if 'sort' in content:
-                    data_patterns.append("data sorting")
-                    
-                if data_patterns:
-                    analysis.append(f"Data processing: {', '.join(data_patterns)}")
-            
-            # Business logic patterns
-            business_keywords = {
-                'auth': 'authentication/authorization',
-                'login': 'user login',
-                'signup': 'user registration', 
-                'dashboard': 'main interface',
-                'spending': 'expense tracking',
-                'budget': 'budget management',
-                'chart': 'data visualization',
-                'theme': 'UI theming',
-                'settings': 'configuration',
-                'profile': 'user profile'
-            }
-            
-            found_business = []
-            for keyword, description in business_keywords.items():
-                if keyword in content:
-                    found_business.append(description)
-            
-            if found_business:
-                analysis.append(f"Business logic: {', '.join(found_business)}")
-            
-            return "; ".join(analysis) if analysis else "General utility/helper functionality"
-            
-        except Exception as e:
-            return f"Analysis error: {str(e)}"
+    # Keyword lookups go through the per-repo inverted index instead of scanning every file
+    index_file = os.path.join(os.getcwd(), 'db', f'{repo_name}_index.json')
+    index = load_search_index(index_file, files, file_analysis)
+    analyses = index['analysis']
     
     question_lower = question.lower()
-    relevant_info = []
+    keywords = [keyword for keyword in question_lower.split() if len(keyword) > 2]
+    
+    # Calculate relevance scores; reasons are added field by field, in the same order as a full scan
+    scores: Dict[int, int] = {}
+    reasons: Dict[int, List[str]] = {}
+    def add_match(file_idx, points, reason):
+        scores[file_idx] = scores.get(file_idx, 0) + points
+        reasons.setdefault(file_idx, []).append(reason)
+    
+    # Check file name and path matches
+    for keyword in keywords:
+        for file_idx in candidate_files(index, 'filename', keyword):
+            if keyword in files[file_idx]['name'].lower():
+                add_match(file_idx, 3, f"filename contains '{keyword}'")
+        for file_idx in candidate_files(index, 'path', keyword):
+            if keyword in files[file_idx]['rel'].lower():
+                add_match(file_idx, 2, f"path contains '{keyword}'")
+    
+    # Check function names
+    function_keywords: Dict[int, List[str]] = {}
+    for keyword in keywords:
+        for file_idx in candidate_files(index, 'function', keyword):
+            function_keywords.setdefault(file_idx, []).append(keyword)
+    for file_idx, file_keywords in function_keywords.items():
+        for func_name in files[file_idx]['functions'].keys():
+            func_name_lower = func_name.lower()
+            for keyword in file_keywords:
+                if keyword in func_name_lower:
+                    add_match(file_idx, 2, f"function '{func_name}' contains '{keyword}'")
+    
+    # Check if the analysis of what the file does matches the question
+    for keyword in keywords:
+        for file_idx in candidate_files(index, 'functionality', keyword):
+            if keyword in analyses[file_idx].lower():
+                add_match(file_idx, 4, f"functionality involves '{keyword}'")  # Higher weight for actual functionality matches
     
-    # Enhanced search with actual code analysis
+    # Sort by relevance score, ties in file order
+    ranked = sorted(scores, key=lambda file_idx: (-scores[file_idx], file_idx))
     matches = []
-    for file_path, file_data in functions_data.items():
-        full_path = file_data.get('full_path', file_path)
-        file_name = file_path.split('\\')[-1] if '\\' in file_path else file_path.split('/')[-1]
-        
-        # Calculate relevance score
-        score = 0
-        matched_reasons = []
-        
-        # Check file name and path matches
-        for keyword in question_lower.split():
-            if len(keyword) > 2:
-                if keyword in file_name.lower():
-                    score += 3
-                    matched_reasons.append(f"filename contains '{keyword}'")
-                if keyword in file_path.lower():
-                    score += 2
-                    matched_reasons.append(f"path contains '{keyword}'")
-        
-        # Check function names
-        for func_name in file_data['functions'].keys():
-            for keyword in question_lower.split():
-                if len(keyword) > 2 and keyword in func_name.lower():
-                    score += 2
-                    matched_reasons.append(f"function '{func_name}' contains '{keyword}'")
-        
-        # Analyze what this file actually does
-        code_analysis = analyze_code_content(full_path, file_data)
-        
-        # Check if the analysis matches the question
-        for keyword in question_lower.split():
-            if len(keyword) > 2 and keyword in code_analysis.lower():
-                score += 4  # Higher weight for actual functionality matches
-                matched_reasons.append(f"functionality involves '{keyword}'")
-        
-        if score > 0:
-            matches.append({
-                'file': file_name,
-                'full_path': full_path,
-                'functions': file_data['functions'],
-                'language': file_data['language'],
-                'score': score,
-                'analysis': code_analysis,
-                'matched_reasons': matched_reasons
-            })
+    for file_idx in ranked[:5]:
+        entry = files[file_idx]
+        matches.append({
+            'file': entry['name'],
+            'full_path': entry['full'],
+            'functions': entry['functions'],
+            'language': entry['lang'],
+            'score': scores[file_idx],
+            'analysis': analyses[file_idx],
+            'matched_reasons': reasons[file_idx]
+        })
     
     if matches:
-        # Sort by relevance score
-        matches.sort(key=lambda x: x['score'], reverse=True)
-        top_matches = matches[:5]
+        top_matches = matches
         
         response = f"Here's what I found that's relevant to your question:\n\n"
         
@@ -481,23 +744,21 @@ async def chat_with_repo(repo_name: str, query: dict):
             "question": question,
             "answer": response,
             "context_used": len(top_matches),
-            "total_context": len(functions_data)
+            "total_context": len(files)
         }
     
     # No direct matches - provide repository overview with actual insights
-    total_functions = sum(len(file_data['functions']) for file_data in functions_data.values())
-    total_files = len(functions_data)
-    languages = list(set(file_data['language'] for file_data in functions_data.values()))
+    total_functions = sum(len(entry['functions']) for entry in files)
+    total_files = len(files)
+    languages = list(set(entry['lang'] for entry in files))
     
     # Analyze the overall repository structure
     ui_files = []
     api_files = []
     utility_files = []
     
-    for file_path, file_data in functions_data.items():
-        full_path = file_data.get('full_path', file_path)
-        analysis = analyze_code_content(full_path, file_data)
-        
+    for entry, analysis in zip(files, analyses):
+        file_path = entry['rel']
         if 'ui component' in analysis.lower() or 'user interface' in analysis.lower():
             ui_files.append(file_path.split('\\')[-1])
         elif 'api' in analysis.lower() or 'backend' in analysis.lower():
@@ -1,73 +1,87 @@
-import os
-import tree_sitter_python as tspython
-import tree_sitter_javascript as tsjs
-import tree_sitter_typescript as tsts
-from tree_sitter import Language, Parser
-
-
-def get_parser_for_file(file_path):
-    """Get the appropriate parser based on file extension"""
-    if file_path.endswith('.py'):
-        language = Language(tspython.language())
-        return Parser(language), 'python'
-    elif file_path.endswith('.js') or file_path.endswith('.jsx'):
-        language = Language(tsjs.language())
-        return Parser(language), 'javascript'
-    elif file_path.endswith('.ts'):
-        language = Language(tsts.language_typescript())
-        return Parser(language), 'typescript'
-    elif file_path.endswith('.tsx'):
-        language = Language(tsts.language_tsx())
-        return Parser(language), 'typescript'
-    return None, None
-
-
-def find_docstrings_recursively(node, language_type='python'):
+import re
+from typing import Dict, Optional, cast
+from tree_sitter import Language, Node, Query, QueryCursor, Tree
+
+
+def node_text(node: Node) -> str:
+    """Decoded source text of a node from a tree parsed from bytes"""
+    return cast(bytes, node.text).decode('utf8')
+
+
+# Per-line JSDoc decoration: leading whitespace and '*'s, and trailing whitespace
+_JSDOC_LINE_DECORATION = re.compile(r'^[^\S\n]*\**[^\S\n]*|[^\S\n]+$', re.M)
+
+# Function definition node types that can carry documentation, as one query per language
+DOCUMENTED_FUNCTION_PATTERNS = {
+    'python': "(function_definition) @function",
+    'javascript': "[(function_declaration) (arrow_function) (method_definition)] @function",
+    'typescript': (
+        "[(function_declaration) (arrow_function) (method_definition) (function_signature)] @function"
+    )
+}
+
+# Compiled documented-function queries, keyed by grammar (.ts and .tsx differ)
+_DOC_QUERIES: Dict[Language, Query] = {}
+
+
+def get_doc_query(language: Language, language_type: str) -> Query:
+    """Compile the documented-function query once per grammar"""
+    query = _DOC_QUERIES.get(language)
+    if query is None:
+        query = _DOC_QUERIES[language] = Query(language, DOCUMENTED_FUNCTION_PATTERNS[language_type])
+    return query
+
+
+def find_docstrings(tree: Tree, language_type: str = 'python') -> Dict[str, str]:
     """Find documentation strings/comments for multiple languages"""
-    docstrings = {}
-    
-    # Language-specific function definition patterns
-    function_types = {
-        'python': ['function_definition'],
-        'javascript': ['function_declaration', 'arrow_function', 'method_definition'],
-        'typescript': ['function_declaration', 'arrow_function', 'method_definition', 'function_signature']
-    }
-    
-    if node.type in function_types.get(language_type, []):
-        func_name = extract_function_name(node, language_type)
-        if func_name:
-            docstring = extract_documentation(node, language_type)
-            if docstring:
+    docstrings: Dict[str, str] = {}
+    if language_type not in DOCUMENTED_FUNCTION_PATTERNS:
+        return docstrings
+
+    # tree-sitter's query engine finds the function definitions, so only those nodes
+    # cross into Python. Matches (unlike captures()) come back in document order, the
+    # order the old preorder walk visited them, so later definitions still overwrite earlier ones.
+    query = get_doc_query(tree.language, language_type)
+    for _, captures in QueryCursor(query).matches(tree.root_node):
+        function_node = captures['function'][0]
+        name_node = function_name_node(function_node, language_type)
+        if name_node is None:
+            continue
+        # Most functions have no documentation, so their names are never decoded
+        docstring = extract_documentation(function_node, language_type)
+        if docstring:
+            func_name = node_text(name_node)
+            if func_name:
                 docstrings[func_name] = docstring
-    
-    for child in node.children:
-        child_docstrings = find_docstrings_recursively(child, language_type)
-        docstrings.update(child_docstrings)
-            
     return docstrings
 
 
-def extract_function_name(node, language_type):
-    """Extract function name based on language type"""
+def string_body(string_node: Node) -> str:
+    """Text between a Python string's opening (prefix and quotes) and closing quotes"""
+    children = string_node.children
+    if len(children) >= 2 and children[0].type == 'string_start' and children[-1].type == 'string_end':
+        # Slice at the delimiter tokens; strip() took a character set and also ate
+        # quotes belonging to the docstring itself
+        offset = string_node.start_byte
+        raw = cast(bytes, string_node.text)
+        return raw[children[0].end_byte - offset:children[-1].start_byte - offset].decode('utf8')
+    return node_text(string_node)
+
+
+def function_name_node(node: Node, language_type: str) -> Optional[Node]:
+    """Name node of a function definition, left undecoded"""
     if language_type == 'python':
-        name_node = node.child_by_field_name('name')
-        return name_node.text.decode('utf8') if name_node else None
+        return node.child_by_field_name('name')
     
     elif language_type in ['javascript', 'typescript']:
-        if node.type == 'function_declaration':
-            name_node = node.child_by_field_name('name')
-            return name_node.text.decode('utf8') if name_node else None
-        elif node.type == 'method_definition':
-            name_node = node.child_by_field_name('name')
-            return name_node.text.decode('utf8') if name_node else None
-        elif node.type == 'arrow_function':
-            # For arrow functions, we'd need to look at the assignment
-            return None
+        if node.type in ('function_declaration', 'method_definition'):
+            return node.child_by_field_name('name')
+        # For arrow functions, we'd need to look at the assignment
     
     return None
 
 
-def extract_documentation(node, language_type):
+def extract_documentation(node: Node, language_type: str) -> Optional[str]:
     """Extract documentation based on language type"""
     if language_type == 'python':
         # Python docstrings
@@ -77,27 +91,25 @@ def extract_documentation(node, language_type):
             if first_child and first_child.type == 'expression_statement':
                 string_node = first_child.children[0] if first_child.children else None
                 if string_node and string_node.type == 'string':
-                    docstring_text = string_node.text.decode('utf8').strip().strip('"""').strip("'''")
+                    docstring_text = string_body(string_node)
                     return docstring_text if docstring_text else None
     
     elif language_type in ['javascript', 'typescript']:
         # Look for JSDoc comments before the function
-        # Find the previous sibling that might be a comment
-        parent = node.parent
-        if parent:
-            node_index = parent.children.index(node)
-            if node_index > 0:
-                prev_node = parent.children[node_index - 1]
-                if prev_node.type == 'comment':
-                    comment_text = prev_node.text.decode('utf8')
-                    # Clean up JSDoc comment
-                    if comment_text.startswith('/**') and comment_text.endswith('*/'):
-                        # Remove /** */ and clean up
-                        cleaned = comment_text[3:-2].strip()
-                        lines = [line.strip().lstrip('*').strip() for line in cleaned.split('\n')]
-                        return '\n'.join(lines).strip()
-                    elif comment_text.startswith('//'):
-                        # Single line comment
-                        return comment_text[2:].strip()
+        # The previous sibling that might be a comment; prev_sibling is a direct
+        # tree link, unlike searching the parent's children list for this node
+        prev_node = node.prev_sibling
+        if prev_node is not None and prev_node.type == 'comment':
+            # The markers are ASCII, so check them on the bytes and only decode
+            # comments that are kept
+            comment_bytes = cast(bytes, prev_node.text)
+            # Clean up JSDoc comment
+            if comment_bytes.startswith(b'/**') and comment_bytes.endswith(b'*/'):
+                # Remove /** */ and clean up
+                cleaned = comment_bytes[3:-2].decode('utf8').strip()
+                return _JSDOC_LINE_DECORATION.sub('', cleaned).strip()
+            elif comment_bytes.startswith(b'//'):
+                # Single line comment
+                return comment_bytes[2:].decode('utf8').strip()
     
     return None
\ No newline at end of file